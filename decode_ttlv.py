@@ -7,13 +7,18 @@ import struct
 import time
 
 
+# Precompiled big-endian unpackers for the header fields and primitive values
+_UNPACK_TAG = struct.Struct(">Bh").unpack_from
+_UNPACK_UBYTE = struct.Struct(">B").unpack_from
+_UNPACK_UINT = struct.Struct(">I").unpack_from
+_UNPACK_INT = struct.Struct(">i").unpack_from
+_UNPACK_LONG = struct.Struct(">q").unpack_from
+_UNPACK_ULONG = struct.Struct(">Q").unpack_from
+
+
 class DecodeTTLV(object):
     def __init__(self, buffer):
-        self.attribute_name = "".encode("utf-8")
-        self.offset = 0
-        self.buffer = buffer
-        self.indent = ""
-        self.nest = []
+        self.reset(buffer)
         self.type_map = {
             'DEFAULT': self._decode_type_default,
             'STRUCTURE': self._decode_type_struct,
@@ -29,7 +34,24 @@ class DecodeTTLV(object):
             'DATE_TIME_EXTENDED': self._decode_type_exdate,
         }
 
-    def decode(self):
+    def reset(self, buffer):
+        # Start over on a new buffer, so one decoder can be reused
+        self.attribute_name = "".encode("utf-8")
+        self.offset = 0
+        self.buffer = buffer
+        self.indent = ""
+        self.nest = []
+
+    def decode(self, out=None):
+        # Lines are appended to out when a list is given, printed otherwise
+        if out is None:
+            for line in self.decode_iter():
+                print(line)
+        else:
+            out.extend(self.decode_iter())
+
+    def decode_iter(self):
+        # Yield each line as soon as its element has been decoded
         while self.offset < len(self.buffer):
             self.indent = " " * len(self.nest)
 
@@ -38,16 +60,15 @@ class DecodeTTLV(object):
             size_val = self._decode_size()
             value = self.type_map[type_val](tag_val, size_val)
 
-            print("{0}{1}:{2}({3}):{4}".format(
-                self.indent, tag_val, type_val, size_val, value))
+            yield "{0}{1}:{2}({3}):{4}".format(
+                self.indent, tag_val, type_val, size_val, value)
 
             while len(self.nest) and self.offset == self.nest[-1]:
                 self.nest = self.nest[:-1]
                 self.indent = " " * len(self.nest)
 
     def _decode_tag(self):
-        fmt = ">Bh"
-        tag = struct.unpack_from(fmt, self.buffer, self.offset)
+        tag = _UNPACK_TAG(self.buffer, self.offset)
         if tag[0] != 0x42:
             print(binascii.hexlify(self.buffer[self.offset:]))
             raise Exception(
@@ -60,15 +81,13 @@ class DecodeTTLV(object):
         return out
 
     def _decode_type(self):
-        fmt = ">B"
-        val = struct.unpack_from(fmt, self.buffer, self.offset)[0]
+        val = _UNPACK_UBYTE(self.buffer, self.offset)[0]
         out = self._get_enum_name('Types', val)
         self.offset += 1
         return out
 
     def _decode_size(self):
-        fmt = ">I"
-        val = struct.unpack_from(fmt, self.buffer, self.offset)[0]
+        val = _UNPACK_UINT(self.buffer, self.offset)[0]
         self.offset += 4
         return val
 
@@ -81,26 +100,22 @@ class DecodeTTLV(object):
         return "stru{0}".format(len(self.nest))
 
     def _decode_type_int4(self, tag, size):
-        fmt = ">i"
-        val = struct.unpack_from(fmt, self.buffer, self.offset)
+        val = _UNPACK_INT(self.buffer, self.offset)
         self.offset += size + 4  # 4 bytes padding
         return val[0]
 
     def _decode_type_long(self, tag, size):
-        fmt = ">q"
-        val = struct.unpack_from(fmt, self.buffer, self.offset)
+        val = _UNPACK_LONG(self.buffer, self.offset)
         self.offset += size  # 8
         return val[0]
 
     def _decode_type_bigint(self, tag, size):
-        fmt = ">q"  # FIXME(tkelsey): this is wrong
-        val = struct.unpack_from(fmt, self.buffer, self.offset)
+        val = _UNPACK_LONG(self.buffer, self.offset)  # FIXME(tkelsey): this is wrong
         self.offset += size  # variable
         return val[0]
 
     def _decode_type_enum(self, tag, size):
-        fmt = ">I"
-        val = struct.unpack_from(fmt, self.buffer, self.offset)
+        val = _UNPACK_UINT(self.buffer, self.offset)
         self.offset += size + 4  # 4 bytes padding
         if tag == "ATTRIBUTE_VALUE":
             return self._get_enum_name_attr(tag, val[0])
@@ -108,8 +123,7 @@ class DecodeTTLV(object):
             return self._get_enum_name(tag, val[0])
 
     def _decode_type_bool(self, tag, size):
-        fmt = ">Q"
-        val = struct.unpack_from(fmt, self.buffer, self.offset)
+        val = _UNPACK_ULONG(self.buffer, self.offset)
         self.offset += size  # variable
         return (val[0] != 0)
 
@@ -126,20 +140,17 @@ class DecodeTTLV(object):
         return binascii.hexlify(val)
 
     def _decode_type_date(self, tag, size):
-        fmt = ">Q"
-        val = struct.unpack_from(fmt, self.buffer, self.offset)
+        val = _UNPACK_ULONG(self.buffer, self.offset)
         self.offset += size  # variable
         return time.ctime(val[0])
 
     def _decode_type_inter(self, tag, size):
-        fmt = ">i"
-        val = struct.unpack_from(fmt, self.buffer, self.offset)
+        val = _UNPACK_INT(self.buffer, self.offset)
         self.offset += size + 4  # 4 bytes padding
         return val[0]
 
     def _decode_type_exdate(self, tag, size):
-        fmt = ">Q"
-        val = struct.unpack_from(fmt, self.buffer, self.offset)
+        val = _UNPACK_ULONG(self.buffer, self.offset)
         self.offset += size  # variable
         return time.ctime(val[0])
 
@@ -188,14 +199,8 @@ class DecodeTTLV(object):
 
 if __name__ == '__main__':
     import sys
-    bindata = "".encode('utf-8')
     testdata = sys.argv[1]
 
-    for i in range(0, int(len(testdata)/2)):
-        a = testdata[i*2]
-        b = testdata[i*2+1]
-        bindata += struct.pack(">B", int(a+b, 16))
-
-    bindata = bytearray(bindata)
+    bindata = bytearray.fromhex(testdata)
     decoder = DecodeTTLV(bindata)
     decoder.decode()
@@ -2,95 +2,325 @@ from __future__ import print_function
 
 from kmip.core import enums
 
-import binascii
+import datetime
 import struct
 import time
 
+# google-re2 is optional; it matches with a linear-time automaton and has
+# the same API as the re module, which is used when it's missing
+try:
+    import re2 as re
+except ImportError:
+    import re
+
+
+# TTLV header: 0x42 + 2-byte tag, 1-byte type, 4-byte size
+_HEADER = struct.Struct(">BHBI")
+_EMPTY_HEADER = bytes(_HEADER.size)
+
+# Complete INTEGER element: header, 4-byte value and 4 bytes padding
+_INT_FIELD = struct.Struct(">BHBIi4x")
+_INTEGER_TYPE = enums.Types.INTEGER.value
+
+# Precompiled big-endian packers for the primitive value types
+_PACK_INT = struct.Struct(">i").pack
+_PACK_UINT = struct.Struct(">I").pack
+_PACK_LONG = struct.Struct(">q").pack
+_PACK_ULONG = struct.Struct(">Q").pack
+
+# Zero padding up to the 8-byte TTLV alignment, sliced as needed
+_ZERO8 = b'\x00' * 8
+_PAD4 = _ZERO8[:4]
+
+# time.ctime() layout used for DATE_TIME values in structured text
+_CTIME_FORMAT = '%a %b %d %H:%M:%S %Y'
+
+# Structured text line: indentation, TAG:TYPE(length):value. The indent is
+# spelled out as spaces and tabs because re2's \s doesn't cover the same
+# characters as re's, and both engines must count it the same way
+_LINE_RE = re.compile(r'^([ \t]*)([^:]*):([^()]*)\(([^)]*)\)(?:[^:]*:)?(.*)$')
+
+# OPERATION enum names, mapped using PyKMIP values
+_OPERATION_ENUM = {
+    'CREATE': 1,
+    'CREATE_KEY_PAIR': 2,
+    'REGISTER': 3,
+    'REKEY': 4,
+    'DERIVE_KEY': 5,
+    'CERTIFY': 6,
+    'RECERTIFY': 7,
+    'LOCATE': 8,
+    'CHECK': 9,
+    'GET': 10,
+    'GET_ATTRIBUTES': 11,
+    'GET_ATTRIBUTE_LIST': 12,
+    'ADD_ATTRIBUTE': 13,
+    'MODIFY_ATTRIBUTE': 14,
+    'DELETE_ATTRIBUTE': 15,
+    'OBTAIN_LEASE': 16,
+    'GET_USAGE_ALLOCATION': 17,
+    'ACTIVATE': 18,
+    'REVOKE': 19,
+    'DESTROY': 20,
+    'ARCHIVE': 21,
+    'RECOVER': 22,
+    'VALIDATE': 23,
+    'QUERY': 24,
+    'CANCEL': 25,
+    'POLL': 26,
+    'NOTIFY': 27,
+    'PUT': 28,
+    'REKEY_KEY_PAIR': 29,
+    'DISCOVER_VERSIONS': 30,
+    'ENCRYPT': 31,
+    'DECRYPT': 32,
+    'SIGN': 33,
+    'SIGNATURE_VERIFY': 34,
+    'MAC': 35,
+    'MAC_VERIFY': 36,
+    'RNG_RETRIEVE': 37,
+    'RNG_SEED': 38,
+    'HASH': 39,
+    'CREATE_SPLIT_KEY': 40,
+    'JOIN_SPLIT_KEY': 41,
+    'IMPORT': 42,
+    'EXPORT': 43,
+    'LOG': 44,
+    'LOGIN': 45,
+    'LOGOUT': 46,
+    'DELEGATED_LOGIN': 47,
+    'ADJUST_ATTRIBUTE': 48,
+    'SET_ATTRIBUTE': 49,
+    'SET_ENDPOINT_ROLE': 50,
+    'PKCS_11': 51,
+    'INTEROP': 52,
+    'REPROVISION': 53
+}
+
+# Hand-rolled enum values, keyed by tag, checked before the PyKMIP enums
+_COMMON_MAPPINGS = {
+    # Common attribute value enums
+    'ATTRIBUTE_VALUE': {
+        'AES': 3,
+        'DES': 1,
+        'TRIPLE_DES': 2,
+        'RSA': 4,
+        'DSA': 5,
+        'SYMMETRIC_KEY': 2,
+        'PUBLIC_KEY': 3,
+        'PRIVATE_KEY': 4,
+        'CERTIFICATE': 6,
+        'USERNAME_AND_PASSWORD': 1,
+        'DEVICE_SPECIFIC': 2
+    },
+    'CREDENTIAL_TYPE': {
+        'USERNAME_AND_PASSWORD': 1,
+        'DEVICE_SPECIFIC': 2
+    },
+    'OBJECT_TYPE': {
+        'CERTIFICATE': 1,
+        'SYMMETRIC_KEY': 2,
+        'PUBLIC_KEY': 3,
+        'PRIVATE_KEY': 4,
+        'SPLIT_KEY': 5,
+        'TEMPLATE': 6,
+        'SECRET_DATA': 7,
+        'OPAQUE_DATA': 8
+    },
+    'OBJECT_GROUP': {
+        'DEFAULT': 0,
+        'NONE': 0
+    },
+}
+
+# Common KMIP state values for attribute enumerations
+_STATE_MAPPINGS = {
+    'PRE_ACTIVE': 1,
+    'ACTIVE': 2,
+    'DEACTIVATED': 3,
+    'COMPROMISED': 4,
+    'DESTROYED': 5,
+    'DESTROYED_COMPROMISED': 6
+}
+
+# Lazily built {member name: value} dicts, keyed by PyKMIP enum class name
+_ENUM_NAME_TO_VALUE = {}
+
+# The same dicts, keyed by the tag style name (e.g. OBJECT_TYPE)
+_TAG_ENUM_MAPS = {}
+
+# Header field values for tag and type names seen so far
+_TAG_CACHE = {}
+_TYPE_CACHE = {}
+
+# Resolved attribute enum values, keyed by (attribute name, enum name)
+_ATTR_ENUM_VALUE_CACHE = {}
+
+
+def _get_enum_map(type_name):
+    """Return the {member name: value} dict for a PyKMIP enum class"""
+    enum_map = _ENUM_NAME_TO_VALUE.get(type_name)
+    if enum_map is None:
+        try:
+            members = getattr(enums, type_name).__members__
+            enum_map = {name: member.value for name, member in members.items()}
+        except AttributeError:
+            # Enum class doesn't exist
+            enum_map = {}
+        _ENUM_NAME_TO_VALUE[type_name] = enum_map
+    return enum_map
+
+
+def _get_tag_enum_map(enum_name):
+    """Return the {member name: value} dict for the enum named like a tag"""
+    enum_map = _TAG_ENUM_MAPS.get(enum_name)
+    if enum_map is None:
+        type_name = ''.join(x.capitalize() or '_' for x in enum_name.split('_'))
+        enum_map = _get_enum_map(type_name)
+        _TAG_ENUM_MAPS[enum_name] = enum_map
+    return enum_map
+
+
+def _parse_time_string(value):
+    """
+    Convert a date/time string to a Unix timestamp
+    
+    ISO 8601 strings without a UTC offset and time.ctime() strings are read
+    as local time, matching the time.ctime() output of the decoder
+    """
+    # Integer timestamp strings are the cheapest to handle
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    
+    try:
+        parsed = datetime.datetime.fromisoformat(value)
+    except ValueError:
+        # time.ctime() format, as written by the decoder
+        return int(time.mktime(time.strptime(value, _CTIME_FORMAT)))
+    
+    if parsed.tzinfo is not None:
+        return int(parsed.timestamp())
+    return int(time.mktime(parsed.timetuple()))
+
 
 class EncodeTTLV(object):
     def __init__(self):
+        self.reset()
+        self.type_map = {
+            'STRUCTURE': self._encode_type_struct,
+            'INTEGER': self._encode_type_int4,
+            'LONG_INTEGER': self._encode_type_long,
+            'BIG_INTEGER': self._encode_type_bigint,
+            'ENUMERATION': self._encode_type_enum,
+            'BOOLEAN': self._encode_type_bool,
+            'TEXT_STRING': self._encode_type_text,
+            'BYTE_STRING': self._encode_type_bytes,
+            'DATE_TIME': self._encode_type_date,
+            'INTERVAL': self._encode_type_inter,
+            'DATE_TIME_EXTENDED': self._encode_type_exdate,
+        }
+        
+    def reset(self):
+        """Start a new, empty buffer so one encoder can be reused"""
+        # A fresh bytearray, so buffers returned by get_buffer() are left intact
         self.buffer = bytearray()
         self.attribute_name = "".encode("utf-8")
-        
+    
     def get_buffer(self):
         """Return the encoded TTLV buffer"""
         return self.buffer
     
+    def write_to(self, fileobj):
+        """Write the encoded TTLV buffer to a binary file object"""
+        with memoryview(self.buffer) as view:
+            return fileobj.write(view)
+    
     def get_hex_string(self):
         """Return the encoded TTLV buffer as a hex string"""
-        return binascii.hexlify(self.buffer).decode('utf-8')
+        return self.buffer.hex()
     
     def encode_ttlv(self, tag, type_name, value):
         """Encode a single TTLV element"""
-        # Encode the tag (3 bytes: 0x42 + 2-byte tag value)
-        tag_bytes = self._encode_tag(tag)
-        
-        # Encode the type (1 byte)
-        type_byte = self._encode_type(type_name)
+        return self._encode_ttlv_into(tag, type_name, value, self.buffer)
+    
+    def _encode_ttlv_into(self, tag, type_name, value, out):
+        """Encode a single TTLV element into the given bytearray"""
+        if type_name == 'INTEGER':
+            return self._encode_int_field(tag, value, out)
         
-        # Encode the value and get its size
-        value_bytes, size = self._encode_value(type_name, value, tag)
+        # Look up the tag (0x42 + 2-byte tag value) and the 1-byte type
+        tag_value = self._get_tag_value(tag)
+        type_value = _TYPE_CACHE.get(type_name)
+        if type_value is None:
+            type_value = self._get_enum_value('Types', type_name)
+            _TYPE_CACHE[type_name] = type_value
         
-        # Encode the size (4 bytes)
-        size_bytes = struct.pack(">I", size)
+        encode_type = self.type_map.get(type_name)
+        if encode_type is None:
+            raise Exception("Unsupported type: {0}".format(type_name))
         
-        # Combine all parts
-        self.buffer.extend(tag_bytes)
-        self.buffer.extend(type_byte)
-        self.buffer.extend(size_bytes)
-        self.buffer.extend(value_bytes)
+        # Reserve the 8-byte header, write the value after it and fill the
+        # header in place once the size is known
+        offset = len(out)
+        out.extend(_EMPTY_HEADER)
+        try:
+            if type_name == 'STRUCTURE' and isinstance(value, (list, tuple)):
+                # Structure children go straight into the output buffer
+                self._encode_struct_into(value, out)
+                size = len(out) - offset - _HEADER.size
+            else:
+                value_bytes, size = encode_type(value, tag)
+                out.extend(value_bytes)
+        except Exception:
+            # Leave the buffer as it was before this element
+            del out[offset:]
+            raise
+        _HEADER.pack_into(out, offset, 0x42, tag_value, type_value, size)
         
-        return len(tag_bytes) + len(type_byte) + len(size_bytes) + len(value_bytes)
-    
-    def _encode_tag(self, tag):
-        """Encode tag as 3 bytes: 0x42 + 2-byte tag value"""
-        tag_value = self._get_enum_value('Tags', tag)
-        # Extract the 2-byte tag value from the 3-byte combined value
-        tag_lower = tag_value & 0xFFFF
-        return struct.pack(">Bh", 0x42, tag_lower)
-    
-    def _encode_type(self, type_name):
-        """Encode type as 1 byte"""
-        type_value = self._get_enum_value('Types', type_name)
-        return struct.pack(">B", type_value)
-    
-    def _encode_value(self, type_name, value, tag):
-        """Encode value based on type and return (value_bytes, actual_size)"""
-        if type_name == 'STRUCTURE':
-            return self._encode_type_struct(value)
-        elif type_name == 'INTEGER':
-            return self._encode_type_int4(value)
-        elif type_name == 'LONG_INTEGER':
-            return self._encode_type_long(value)
-        elif type_name == 'BIG_INTEGER':
-            return self._encode_type_bigint(value)
-        elif type_name == 'ENUMERATION':
-            return self._encode_type_enum(value, tag)
-        elif type_name == 'BOOLEAN':
-            return self._encode_type_bool(value)
-        elif type_name == 'TEXT_STRING':
-            return self._encode_type_text(value, tag)
-        elif type_name == 'BYTE_STRING':
-            return self._encode_type_bytes(value)
-        elif type_name == 'DATE_TIME':
-            return self._encode_type_date(value)
-        elif type_name == 'INTERVAL':
-            return self._encode_type_inter(value)
-        elif type_name == 'DATE_TIME_EXTENDED':
-            return self._encode_type_exdate(value)
-        else:
-            raise Exception("Unsupported type: {0}".format(type_name))
-    
-    def _encode_type_struct(self, value):
+        return len(out) - offset
+    
+    def _encode_int_field(self, tag, value, out):
+        """Encode a complete INTEGER element with a single 16-byte pack"""
+        tag_value = self._get_tag_value(tag)
+        int_value = int(value)
+        # Pack before touching the buffer, so an out of range value leaves it as it was
+        out.extend(_INT_FIELD.pack(0x42, tag_value, _INTEGER_TYPE, 4, int_value))
+        return _INT_FIELD.size
+    
+    def _get_tag_value(self, tag):
+        """Get the 2-byte header value for a tag name"""
+        tag_value = _TAG_CACHE.get(tag)
+        if tag_value is None:
+            tag_value = self._get_enum_value('Tags', tag) & 0xFFFF
+            _TAG_CACHE[tag] = tag_value
+        return tag_value
+    
+    def _encode_struct_into(self, elements, out):
+        """Encode a list of structure children into the given bytearray"""
+        # Each element starts without an attribute name, the same as it
+        # would in a fresh encoder
+        attribute_name = self.attribute_name
+        encode_into = self._encode_ttlv_into
+        try:
+            for element in elements:
+                try:
+                    tag, type_name, value = element['tag'], element['type'], element['value']
+                except (KeyError, TypeError):
+                    continue  # Not a TTLV element dict, skip it
+                self.attribute_name = "".encode("utf-8")
+                encode_into(tag, type_name, value, out)
+        finally:
+            # Restore it even if a child fails, so the encoder stays usable
+            self.attribute_name = attribute_name
+    
+    def _encode_type_struct(self, value, tag):
         """Encode structure - value should be a list of TTLV elements"""
         if isinstance(value, (list, tuple)):
             # If value is a list of TTLV elements, encode them
             struct_buffer = bytearray()
-            for element in value:
-                if isinstance(element, dict) and 'tag' in element and 'type' in element and 'value' in element:
-                    encoder = EncodeTTLV()
-                    encoder.encode_ttlv(element['tag'], element['type'], element['value'])
-                    struct_buffer.extend(encoder.get_buffer())
+            self._encode_struct_into(value, struct_buffer)
             return struct_buffer, len(struct_buffer)
         elif isinstance(value, bytes):
             # If value is already encoded bytes
@@ -99,21 +329,20 @@ class EncodeTTLV(object):
             # Empty structure
             return b'', 0
     
-    def _encode_type_int4(self, value):
+    def _encode_type_int4(self, value, tag):
         """Encode 32-bit integer with 4-byte padding"""
-        data = struct.pack(">i", int(value))
-        padded_data = data + b'\x00' * 4  # 4 bytes padding
+        padded_data = _PACK_INT(int(value)) + _PAD4  # 4 bytes padding
         return padded_data, 4  # actual size is 4, not 8
     
-    def _encode_type_long(self, value):
+    def _encode_type_long(self, value, tag):
         """Encode 64-bit long integer"""
-        data = struct.pack(">q", int(value))
+        data = _PACK_LONG(int(value))
         return data, 8
     
-    def _encode_type_bigint(self, value):
+    def _encode_type_bigint(self, value, tag):
         """Encode big integer (placeholder implementation)"""
         # For now, treat as 64-bit long
-        data = struct.pack(">q", int(value))
+        data = _PACK_LONG(int(value))
         return data, 8
     
     def _encode_type_enum(self, value, tag):
@@ -125,14 +354,13 @@ class EncodeTTLV(object):
             enum_value = self._get_enum_value_attr(tag, value)
         else:
             enum_value = self._get_enum_value(tag, value)
-        data = struct.pack(">I", enum_value)
-        padded_data = data + b'\x00' * 4  # 4 bytes padding
+        padded_data = _PACK_UINT(enum_value) + _PAD4  # 4 bytes padding
         return padded_data, 4  # actual size is 4, not 8
     
-    def _encode_type_bool(self, value):
+    def _encode_type_bool(self, value, tag):
         """Encode boolean as 8-byte value"""
         bool_value = 1 if value else 0
-        data = struct.pack(">Q", bool_value)
+        data = _PACK_ULONG(bool_value)
         return data, 8
     
     def _encode_type_text(self, value, tag):
@@ -146,45 +374,39 @@ class EncodeTTLV(object):
             self.attribute_name = text_bytes
             
         actual_size = len(text_bytes)
-        padding = (8 - actual_size % 8) % 8
-        padded_data = text_bytes + b'\x00' * padding
+        padded_data = text_bytes + _ZERO8[:(8 - actual_size) & 7]
         return padded_data, actual_size
     
-    def _encode_type_bytes(self, value):
+    def _encode_type_bytes(self, value, tag):
         """Encode byte string with padding to 8-byte boundary"""
-        if isinstance(value, str):
-            # Assume hex string
-            byte_data = binascii.unhexlify(value)
-        else:
-            byte_data = bytes(value)
+        # Assume hex string
+        byte_data = bytes.fromhex(value) if isinstance(value, str) else bytes(value)
             
         actual_size = len(byte_data)
-        padding = (8 - actual_size % 8) % 8
-        padded_data = byte_data + b'\x00' * padding
+        padded_data = byte_data + _ZERO8[:(8 - actual_size) & 7]
         return padded_data, actual_size
     
-    def _encode_type_date(self, value):
+    def _encode_type_date(self, value, tag):
         """Encode date/time as 8-byte timestamp"""
         if isinstance(value, (int, float)):
             timestamp = int(value)
         elif isinstance(value, str):
             # Parse time string to timestamp
-            timestamp = int(time.mktime(time.strptime(value)))
+            timestamp = _parse_time_string(value)
         else:
             timestamp = int(time.time())
             
-        data = struct.pack(">Q", timestamp)
+        data = _PACK_ULONG(timestamp)
         return data, 8
     
-    def _encode_type_inter(self, value):
+    def _encode_type_inter(self, value, tag):
         """Encode interval as 32-bit integer with 4-byte padding"""
-        data = struct.pack(">i", int(value))
-        padded_data = data + b'\x00' * 4  # 4 bytes padding
+        padded_data = _PACK_INT(int(value)) + _PAD4  # 4 bytes padding
         return padded_data, 4  # actual size is 4, not 8
     
-    def _encode_type_exdate(self, value):
+    def _encode_type_exdate(self, value, tag):
         """Encode extended date/time as 8-byte timestamp"""
-        return self._encode_type_date(value)
+        return self._encode_type_date(value, tag)
     
     def _get_enum_value(self, enum_name, name):
         """Get enum value by name"""
@@ -193,75 +415,13 @@ class EncodeTTLV(object):
             return name
         
         # Special handling for common enum values
-        if enum_name == 'ATTRIBUTE_VALUE':
-            # Common attribute value enums
-            common_mappings = {
-                'AES': 3,
-                'DES': 1,
-                'TRIPLE_DES': 2,
-                'RSA': 4,
-                'DSA': 5,
-                'SYMMETRIC_KEY': 2,
-                'PUBLIC_KEY': 3,
-                'PRIVATE_KEY': 4,
-                'CERTIFICATE': 6,
-                'USERNAME_AND_PASSWORD': 1,
-                'DEVICE_SPECIFIC': 2
-            }
-            if name in common_mappings:
-                return common_mappings[name]
-        
-        # Special mappings for other common enums
-        if enum_name == 'CREDENTIAL_TYPE':
-            credential_mappings = {
-                'USERNAME_AND_PASSWORD': 1,
-                'DEVICE_SPECIFIC': 2
-            }
-            if name in credential_mappings:
-                return credential_mappings[name]
+        common_mappings = _COMMON_MAPPINGS.get(enum_name)
+        if common_mappings and name in common_mappings:
+            return common_mappings[name]
         
-        if enum_name == 'OBJECT_TYPE':
-            object_mappings = {
-                'CERTIFICATE': 1,
-                'SYMMETRIC_KEY': 2,
-                'PUBLIC_KEY': 3,
-                'PRIVATE_KEY': 4,
-                'SPLIT_KEY': 5,
-                'TEMPLATE': 6,
-                'SECRET_DATA': 7,
-                'OPAQUE_DATA': 8
-            }
-            if name in object_mappings:
-                return object_mappings[name]
-        
-        if enum_name == 'OBJECT_GROUP':
-            group_mappings = {
-                'DEFAULT': 0,
-                'NONE': 0
-            }
-            if name in group_mappings:
-                return group_mappings[name]
-            
-        type_name = ''.join(x.capitalize() or '_' for x in enum_name.split('_'))
-        
-        try:
-            enum_class = getattr(enums, type_name)
-            
-            # Try to get the enum value by name
-            if hasattr(enum_class, str(name)):
-                enum_val = getattr(enum_class, str(name))
-                if hasattr(enum_val, 'value'):
-                    return enum_val.value
-            
-            # If not found by name, search through all enum values
-            for attr_name in dir(enum_class):
-                enum_val = getattr(enum_class, attr_name)
-                if hasattr(enum_val, 'name') and enum_val.name == str(name):
-                    return enum_val.value
-                    
-        except AttributeError:
-            # If enum class doesn't exist, try some fallbacks
-            pass
+        value = _get_tag_enum_map(enum_name).get(str(name))
+        if value is not None:
+            return value
                 
         raise ValueError("Enum value '{0}' not found in {1}".format(name, enum_name))
     
@@ -272,22 +432,19 @@ class EncodeTTLV(object):
             return name
         
         # Special handling for common KMIP state values
-        state_mappings = {
-            'PRE_ACTIVE': 1,
-            'ACTIVE': 2,
-            'DEACTIVATED': 3,
-            'COMPROMISED': 4,
-            'DESTROYED': 5,
-            'DESTROYED_COMPROMISED': 6
-        }
-        
-        if str(name) in state_mappings:
-            return state_mappings[str(name)]
+        if str(name) in _STATE_MAPPINGS:
+            return _STATE_MAPPINGS[str(name)]
         
         # Debug: check if attribute_name is set
         if not hasattr(self, 'attribute_name') or not self.attribute_name:
             # Fallback: try to get enum value directly from tag
             return self._get_enum_value(tag, name)
+        
+        # Resolved values are cached per (attribute name, enum name) pair
+        cache_key = (self.attribute_name, str(name))
+        value = _ATTR_ENUM_VALUE_CACHE.get(cache_key)
+        if value is not None:
+            return value
             
         try:
             type_name = self.attribute_name.decode('utf-8').replace(' ', '')
@@ -300,22 +457,10 @@ class EncodeTTLV(object):
             enum_classes_to_try = [type_name, 'State', 'CryptographicUsageMask', 'CryptographicAlgorithm']
             
             for enum_class_name in enum_classes_to_try:
-                try:
-                    enum_class = getattr(enums, enum_class_name)
-                    
-                    # Try to get the enum value by name
-                    if hasattr(enum_class, str(name)):
-                        enum_val = getattr(enum_class, str(name))
-                        if hasattr(enum_val, 'value'):
-                            return enum_val.value
-                    
-                    # If not found by name, search through all enum values
-                    for attr_name in dir(enum_class):
-                        enum_val = getattr(enum_class, attr_name)
-                        if hasattr(enum_val, 'name') and enum_val.name == str(name):
-                            return enum_val.value
-                except AttributeError:
-                    continue  # Try next enum class
+                value = _get_enum_map(enum_class_name).get(str(name))
+                if value is not None:
+                    _ATTR_ENUM_VALUE_CACHE[cache_key] = value
+                    return value
                     
             raise ValueError("Enum value '{0}' not found in attribute enums".format(name))
             
@@ -324,17 +469,21 @@ class EncodeTTLV(object):
             return self._get_enum_value(tag, name)
 
 
-def encode_ttlv_structure(elements):
+def encode_ttlv_structure(elements, encoder=None):
     """
     Helper function to encode a list of TTLV elements
     
     Args:
         elements: List of dictionaries with 'tag', 'type', and 'value' keys
+        encoder: Optional EncodeTTLV to reuse; it is reset before encoding
     
     Returns:
         EncodeTTLV object with encoded buffer
     """
-    encoder = EncodeTTLV()
+    if encoder is None:
+        encoder = EncodeTTLV()
+    else:
+        encoder.reset()
     
     for element in elements:
         if not isinstance(element, dict):
@@ -409,7 +558,7 @@ def save_output(encoder, output_file=None, format='hex'):
         # When writing to file, always write binary data
         try:
             with open(output_file, 'wb') as f:
-                f.write(encoder.get_buffer())
+                encoder.write_to(f)
             print(f"Binary output saved to: {output_file}")
         except Exception as e:
             print(f"Error saving to {output_file}: {e}")
@@ -417,7 +566,7 @@ def save_output(encoder, output_file=None, format='hex'):
         # When printing to console, respect the format parameter
         if format.lower() == 'binary':
             print("Binary output (hex representation):")
-            print(binascii.hexlify(encoder.get_buffer()).decode('utf-8'))
+            print(encoder.get_buffer().hex())
         else:
             print("Hex output:")
             print(encoder.get_hex_string())
@@ -468,61 +617,36 @@ def show_usage():
     print('  {"tag": "ATTRIBUTE_VALUE", "type": "INTEGER", "value": 42}')
     print(']')
 
-def parse_structured_text(text_content):
+def _parse_structured_columns(text_content):
     """
-    Parse structured TTLV text format with indentation
+    Parse structured TTLV text format into parallel per-element lists
     
-    Example format:
-    REQUEST_MESSAGE:STRUCTURE(96):stru1
-     REQUEST_HEADER:STRUCTURE(56):stru2
-      PROTOCOL_VERSION:STRUCTURE(32):stru3
-       PROTOCOL_VERSION_MAJOR:INTEGER(4):1
-       PROTOCOL_VERSION_MINOR:INTEGER(4):1
-      BATCH_COUNT:INTEGER(4):1
-     BATCH_ITEM:STRUCTURE(24):stru2
-      OPERATION:ENUMERATION(4):DISCOVER_VERSIONS
-      REQUEST_PAYLOAD:STRUCTURE(0):stru3
-    
-    Returns: List of elements in hierarchical structure
+    Returns: (tags, types, values, indents, parents), where parents holds
+    the index of each element's enclosing structure, or -1 at top level
     """
     lines = text_content.strip().split('\n')
-    elements = []
-    stack = []  # Stack to track nested structures
+    tags = []
+    types = []
+    values = []
+    indents = []
+    parents = []
+    stack = []  # Indices of the open nested structures
     
     for line_num, line in enumerate(lines, 1):
-        if not line.strip():
+        # Parse the line format: TAG:TYPE(length):value
+        match = _LINE_RE.match(line)
+        if match is None:
             continue
-            
+        
+        indent, tag, type_name, length_str, value = match.groups()
+        
         # Count leading spaces to determine indentation level
-        indent_level = len(line) - len(line.lstrip())
-        line_content = line.strip()
+        indent_level = len(indent)
+        tag = tag.strip()
+        type_name = type_name.strip()
+        value = value.strip()
         
-        # Parse the line format: TAG:TYPE(length):value
         try:
-            # Split by the first colon to get tag and rest
-            if ':' not in line_content:
-                continue
-                
-            tag_part, rest = line_content.split(':', 1)
-            tag = tag_part.strip()
-            
-            # Extract type and length
-            if '(' not in rest or ')' not in rest:
-                continue
-                
-            type_part, value_part = rest.split(')', 1)
-            type_with_length = type_part + ')'
-            
-            # Parse type and length
-            type_name = type_with_length.split('(')[0].strip()
-            length_str = type_with_length.split('(')[1].rstrip(')')
-            
-            # Parse value (after the colon following the type)
-            if ':' in value_part:
-                value = value_part.split(':', 1)[1].strip()
-            else:
-                value = value_part.strip()
-            
             # Convert value based on type
             if type_name == 'INTEGER':
                 try:
@@ -539,64 +663,7 @@ def parse_structured_text(text_content):
                     # Could be enum name like DISCOVER_VERSIONS
                     # For OPERATION tag, map common enum names using PyKMIP values
                     if tag == 'OPERATION':
-                        enum_mapping = {
-                            'CREATE': 1,
-                            'CREATE_KEY_PAIR': 2,
-                            'REGISTER': 3,
-                            'REKEY': 4,
-                            'DERIVE_KEY': 5,
-                            'CERTIFY': 6,
-                            'RECERTIFY': 7,
-                            'LOCATE': 8,
-                            'CHECK': 9,
-                            'GET': 10,
-                            'GET_ATTRIBUTES': 11,
-                            'GET_ATTRIBUTE_LIST': 12,
-                            'ADD_ATTRIBUTE': 13,
-                            'MODIFY_ATTRIBUTE': 14,
-                            'DELETE_ATTRIBUTE': 15,
-                            'OBTAIN_LEASE': 16,
-                            'GET_USAGE_ALLOCATION': 17,
-                            'ACTIVATE': 18,
-                            'REVOKE': 19,
-                            'DESTROY': 20,
-                            'ARCHIVE': 21,
-                            'RECOVER': 22,
-                            'VALIDATE': 23,
-                            'QUERY': 24,
-                            'CANCEL': 25,
-                            'POLL': 26,
-                            'NOTIFY': 27,
-                            'PUT': 28,
-                            'REKEY_KEY_PAIR': 29,
-                            'DISCOVER_VERSIONS': 30,
-                            'ENCRYPT': 31,
-                            'DECRYPT': 32,
-                            'SIGN': 33,
-                            'SIGNATURE_VERIFY': 34,
-                            'MAC': 35,
-                            'MAC_VERIFY': 36,
-                            'RNG_RETRIEVE': 37,
-                            'RNG_SEED': 38,
-                            'HASH': 39,
-                            'CREATE_SPLIT_KEY': 40,
-                            'JOIN_SPLIT_KEY': 41,
-                            'IMPORT': 42,
-                            'EXPORT': 43,
-                            'LOG': 44,
-                            'LOGIN': 45,
-                            'LOGOUT': 46,
-                            'DELEGATED_LOGIN': 47,
-                            'ADJUST_ATTRIBUTE': 48,
-                            'SET_ATTRIBUTE': 49,
-                            'SET_ENDPOINT_ROLE': 50,
-                            'PKCS_11': 51,
-                            'INTEROP': 52,
-                            'REPROVISION': 53
-                        }
-                        if value in enum_mapping:
-                            value = enum_mapping[value]
-                    pass
+                        value = _OPERATION_ENUM.get(value, value)
             elif type_name == 'STRUCTURE':
                 # For structures, we'll handle the value differently
                 # Value might be like "stru1" or could be empty
@@ -608,9 +675,12 @@ def parse_structured_text(text_content):
                     # Python byte string format: b'514c4b4301000000'
                     hex_value = value[2:-1]  # Remove b' and '
                     value = bytes.fromhex(hex_value)
-                elif len(value) % 2 == 0 and all(c in '0123456789abcdefABCDEF' for c in value):
-                    # Plain hex string
-                    value = bytes.fromhex(value)
+                else:
+                    # Plain hex string, anything else is kept as is
+                    try:
+                        value = bytes.fromhex(value)
+                    except ValueError:
+                        pass
             elif type_name == 'TEXT_STRING':
                 # Handle text strings that might be in bytearray format
                 if value.startswith('bytearray(b\'') and value.endswith('\')'):
@@ -625,29 +695,60 @@ def parse_structured_text(text_content):
             while len(stack) > indent_level // 1:  # Assuming 1 space per level
                 stack.pop()
             
-            element = {
-                'tag': tag,
-                'type': type_name,
-                'value': value,
-                'indent_level': indent_level,
-                'children': []
-            }
-            
-            # Add to parent structure if we're nested
-            if stack:
-                parent = stack[-1]
-                parent['children'].append(element)
-            else:
-                elements.append(element)
+            # Record the element against its parent structure, if nested
+            parents.append(stack[-1] if stack else -1)
+            tags.append(tag)
+            types.append(type_name)
+            values.append(value)
+            indents.append(indent_level)
             
             # If this is a structure, add it to the stack for potential children
             if type_name == 'STRUCTURE':
-                stack.append(element)
+                stack.append(len(tags) - 1)
                 
         except Exception as e:
             print(f"Warning: Could not parse line {line_num}: {line.strip()} - {e}")
             continue
     
+    return tags, types, values, indents, parents
+
+def parse_structured_text(text_content):
+    """
+    Parse structured TTLV text format with indentation
+    
+    Example format:
+    REQUEST_MESSAGE:STRUCTURE(96):stru1
+     REQUEST_HEADER:STRUCTURE(56):stru2
+      PROTOCOL_VERSION:STRUCTURE(32):stru3
+       PROTOCOL_VERSION_MAJOR:INTEGER(4):1
+       PROTOCOL_VERSION_MINOR:INTEGER(4):1
+      BATCH_COUNT:INTEGER(4):1
+     BATCH_ITEM:STRUCTURE(24):stru2
+      OPERATION:ENUMERATION(4):DISCOVER_VERSIONS
+      REQUEST_PAYLOAD:STRUCTURE(0):stru3
+    
+    Returns: List of elements in hierarchical structure
+    """
+    tags, types, values, indents, parents = _parse_structured_columns(text_content)
+    elements = []
+    nodes = []
+    
+    for tag, type_name, value, indent_level, parent in zip(tags, types, values, indents, parents):
+        element = {
+            'tag': tag,
+            'type': type_name,
+            'value': value,
+            'indent_level': indent_level,
+            'children': []
+        }
+        nodes.append(element)
+        
+        # Add to parent structure if we're nested
+        if parent >= 0:
+            nodes[parent]['children'].append(element)
+        else:
+            elements.append(element)
+    
     return elements
 
 def convert_structured_to_flat(structured_elements):
@@ -688,14 +789,39 @@ def convert_structured_to_flat(structured_elements):
     
     return flat_elements
 
+def _convert_columns_to_flat(tags, types, values, parents):
+    """
+    Convert parsed structured columns to flat list for encoding
+    """
+    flat_elements = []
+    nodes = []
+    
+    for tag, type_name, value, parent in zip(tags, types, values, parents):
+        if type_name == 'STRUCTURE':
+            value = []  # Structure value is its children
+        element = {
+            'tag': tag,
+            'type': type_name,
+            'value': value
+        }
+        nodes.append(element)
+        
+        # Children always follow their parent, so it already exists here
+        if parent >= 0:
+            nodes[parent]['value'].append(element)
+        else:
+            flat_elements.append(element)
+    
+    return flat_elements
+
 def load_from_structured_text_file(filename):
     """Load TTLV structure from structured text file format"""
     try:
         with open(filename, 'r', encoding='utf-8') as f:
             content = f.read()
         
-        structured_elements = parse_structured_text(content)
-        flat_elements = convert_structured_to_flat(structured_elements)
+        tags, types, values, indents, parents = _parse_structured_columns(content)
+        flat_elements = _convert_columns_to_flat(tags, types, values, parents)
         return flat_elements
     except Exception as e:
         print(f"Error loading structured text file {filename}: {e}")
@@ -711,8 +837,8 @@ def encode_from_structured_text(text_content):
     Returns:
         EncodeTTLV object with encoded data
     """
-    structured_elements = parse_structured_text(text_content)
-    flat_elements = convert_structured_to_flat(structured_elements)
+    tags, types, values, indents, parents = _parse_structured_columns(text_content)
+    flat_elements = _convert_columns_to_flat(tags, types, values, parents)
     
     return encode_ttlv_structure(flat_elements)
 
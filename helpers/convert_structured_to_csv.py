@@ -6,9 +6,82 @@ Convert structured text TTLV files to CSV format
 import os
 import sys
 import csv
-import re
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+# TTLV_VERBOSE=1 prints every file as it's converted instead of periodic progress
+VERBOSE = os.environ.get('TTLV_VERBOSE') == '1'
+_PROGRESS_EVERY = 100
+
+# Data types accepted in the structured text format
+_TYPES = frozenset(['TEXT_STRING', 'BYTE_STRING', 'INTEGER', 'LONG_INTEGER', 'ENUMERATION', 'BOOLEAN', 'STRUCTURE', 'DATE_TIME'])
+
+# Characters allowed in a tag name
+_TAG_CHARS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ_'
+
+# Wrappers around TEXT_STRING (bytearray(b'...')) and BYTE_STRING (b'...') values
+_BA_PREFIX = "bytearray(b'"
+_BA_SUFFIX = "')"
+_BA_PREFIX_LEN = len(_BA_PREFIX)
+_BA_SUFFIX_LEN = len(_BA_SUFFIX)
+_B_PREFIX = "b'"
+_B_SUFFIX = "'"
+_B_PREFIX_LEN = len(_B_PREFIX)
+_B_SUFFIX_LEN = len(_B_SUFFIX)
+
+# BOOLEAN spellings that need no case folding
+_BOOL_TRUE = frozenset(['true', 'True', 'TRUE', '1', 'yes', 'Yes', 'YES'])
+_BOOL_FALSE = frozenset(['false', 'False', 'FALSE', '0', 'no', 'No', 'NO'])
+
+def _strip_bytearray(value):
+    """Remove the bytearray(b'...') wrapper from a TEXT_STRING value, if present."""
+    if value.startswith(_BA_PREFIX) and value.endswith(_BA_SUFFIX):
+        return value[_BA_PREFIX_LEN:-_BA_SUFFIX_LEN]  # Remove bytearray(b' and ')
+    return value
+
+def _strip_bprefix(value):
+    """Remove the b'...' wrapper from a BYTE_STRING value, if present."""
+    if value.startswith(_B_PREFIX) and value.endswith(_B_SUFFIX):
+        return value[_B_PREFIX_LEN:-_B_SUFFIX_LEN]  # Remove b' and '
+    return value
+
+def _parse_enum(value):
+    """Convert an ENUMERATION value to int if it's numeric, otherwise keep the name."""
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+def _parse_bool(value):
+    """Convert a BOOLEAN value."""
+    # Common spellings are looked up directly; only unusual casing is lowered
+    if value in _BOOL_TRUE:
+        return True
+    if value in _BOOL_FALSE:
+        return False
+    return value.lower() in ('true', '1', 'yes')
+
+def _parse_datetime(value):
+    """Convert a DATE_TIME value, handling both Unix timestamps and date strings."""
+    try:
+        # Try to parse as Unix timestamp first
+        return int(value)
+    except ValueError:
+        # If it's a date string, keep it as string
+        return value
+
+# Value converters for each data type. Structures are left out, since CSV
+# is flat and doesn't include them.
+_HANDLERS = {
+    "TEXT_STRING": _strip_bytearray,
+    "BYTE_STRING": _strip_bprefix,
+    "INTEGER": int,
+    "LONG_INTEGER": int,
+    "ENUMERATION": _parse_enum,
+    "BOOLEAN": _parse_bool,
+    "DATE_TIME": _parse_datetime,
+}
+
 def parse_structured_line(line):
     """Parse a single line of structured text format."""
     # Remove leading whitespace to determine indentation level
@@ -19,108 +92,85 @@ def parse_structured_line(line):
     indent_level = len(line) - len(stripped)
     
     # Parse the line format: TAG:TYPE(length):value
-    match = re.match(r'^([A-Z_]+):(TEXT_STRING|BYTE_STRING|INTEGER|LONG_INTEGER|ENUMERATION|BOOLEAN|STRUCTURE|DATE_TIME)\((\d+)\):(.*)$', stripped)
-    if not match:
+    tag, _, rest = stripped.partition(':')
+    type_and_length, separator, value = rest.partition('):')
+    data_type, _, length = type_and_length.partition('(')
+    if value.endswith('\n'):
+        value = value[:-1]
+    if (not separator or data_type not in _TYPES or not length.isdecimal()
+            or not tag or tag.strip(_TAG_CHARS) or '\n' in value):
         return None
     
-    tag, data_type, length, value = match.groups()
+    # Only a handful of distinct tags and types recur, so share one string each
+    tag = sys.intern(tag)
+    data_type = sys.intern(data_type)
     
-    # Process the value based on type
-    if data_type == "STRUCTURE":
-        # For structures in CSV, we can skip them since CSV is flat
-        # or represent them as empty values - but typically CSV doesn't include structures
+    convert = _HANDLERS.get(data_type)
+    if convert is None:
         return None
-    elif data_type == "TEXT_STRING":
-        # Remove bytearray(b'...') wrapper if present and extract the actual string
-        if value.startswith("bytearray(b'") and value.endswith("')"):
-            actual_value = value[12:-2]  # Remove bytearray(b' and ')
-        else:
-            actual_value = value
-        return {
-            "tag": tag,
-            "type": data_type,
-            "value": actual_value
-        }
-    elif data_type == "BYTE_STRING":
-        # Handle byte strings - remove b' prefix and ' suffix if present
-        if value.startswith("b'") and value.endswith("'"):
-            actual_value = value[2:-1]  # Remove b' and '
-        else:
-            actual_value = value
-        return {
-            "tag": tag,
-            "type": data_type,
-            "value": actual_value
-        }
-    elif data_type in ["INTEGER", "LONG_INTEGER"]:
-        return {
-            "tag": tag,
-            "type": data_type,
-            "value": int(value)
-        }
-    elif data_type == "ENUMERATION":
-        # Keep enum values as they are (either numeric or string)
-        try:
-            enum_value = int(value)
-        except ValueError:
-            enum_value = value
-        return {
-            "tag": tag,
-            "type": data_type,
-            "value": enum_value
-        }
-    elif data_type == "BOOLEAN":
-        bool_value = value.lower() in ('true', '1', 'yes')
-        return {
-            "tag": tag,
-            "type": data_type,
-            "value": bool_value
-        }
-    elif data_type == "DATE_TIME":
-        # Handle both Unix timestamps and date strings
-        try:
-            # Try to parse as Unix timestamp first
-            timestamp_value = int(value)
-        except ValueError:
-            # If it's a date string, keep it as string
-            timestamp_value = value
-        return {
-            "tag": tag,
-            "type": data_type,
-            "value": timestamp_value
-        }
     
-    return None
+    return {
+        "tag": tag,
+        "type": data_type,
+        "value": convert(value)
+    }
 
-def convert_structured_to_csv(structured_text):
-    """Convert structured text to CSV format."""
-    lines = structured_text.strip().split('\n')
-    csv_rows = []
+def _strip_lines(lines):
+    """Yield the non-blank lines, trimmed as if the whole text had been strip()ped.
     
+    The first line loses its leading whitespace and the last its trailing
+    whitespace, so parsing a file line by line matches parsing its text.
+    """
+    previous = None
     for line in lines:
+        line = line.rstrip('\n')
+        if not line.strip():
+            continue  # Blank lines don't parse to anything
+        if previous is None:
+            line = line.lstrip()
+        else:
+            yield previous
+        previous = line
+    if previous is not None:
+        yield previous.rstrip()
+
+def _iter_values(lines):
+    """Yield (tag, type, value) for each structured text line that holds a value."""
+    for line in _strip_lines(lines):
         parsed = parse_structured_line(line)
         if parsed:
             # CSV format: TAG,TYPE,VALUE
-            csv_rows.append([parsed["tag"], parsed["type"], str(parsed["value"])])
-    
-    return csv_rows
+            yield (parsed["tag"], parsed["type"], parsed["value"])
+
+def iter_csv_rows(lines):
+    """Yield a CSV row for each structured text line that holds a value."""
+    for tag, data_type, value in _iter_values(lines):
+        yield [tag, data_type, str(value)]
+
+def convert_structured_to_csv(structured_text):
+    """Convert structured text to CSV format."""
+    lines = structured_text.strip().split('\n')
+    return list(iter_csv_rows(lines))
 
 def convert_file(input_path, output_path):
     """Convert a single structured text file to CSV."""
     try:
-        with open(input_path, 'r', encoding='utf-8') as f:
-            structured_text = f.read()
-        
-        csv_rows = convert_structured_to_csv(structured_text)
+        # Parse the whole file before opening the output, so a bad line
+        # doesn't leave a partial CSV behind
+        with open(input_path, 'r', encoding='utf-8') as f_in:
+            rows = list(_iter_values(f_in))
         
-        with open(output_path, 'w', encoding='utf-8', newline='') as f:
-            writer = csv.writer(f)
+        # csv.writer converts int and bool values itself, so rows are
+        # passed through unconverted
+        with open(output_path, 'w', encoding='utf-8', newline='', buffering=1 << 20) as f_out:
+            writer = csv.writer(f_out)
             # Don't write header row - CSV text format doesn't expect headers
             # writer.writerow(['TAG', 'TYPE', 'VALUE'])
             # Write data rows only
-            writer.writerows(csv_rows)
+            writer.writerows(rows)
         
-        return True, len(csv_rows)
+        row_count = len(rows)
+        return True, row_count
     except Exception as e:
         print(f"Error converting {input_path}: {e}")
         return False, 0
@@ -137,25 +187,36 @@ def main():
     # Create CSV directory if it doesn't exist
     csv_dir.mkdir(exist_ok=True)
     
-    # Find all .txt files
-    txt_files = list(structured_dir.glob("*.txt"))
+    # Find all .txt files; scandir reports file types without a stat per entry
+    with os.scandir(structured_dir) as entries:
+        txt_files = [Path(entry.path) for entry in entries
+                     if entry.name.endswith(".txt") and entry.is_file()]
     
     print(f"Converting {len(txt_files)} structured text files to CSV...")
     
+    csv_files = [csv_dir / (txt_file.stem + ".csv") for txt_file in txt_files]
+    
+    # Files are independent, so convert them in parallel across CPU cores
+    with ProcessPoolExecutor() as executor:
+        results = list(executor.map(convert_file, txt_files, csv_files))
+    
     success_count = 0
     total_rows = 0
     
-    for txt_file in txt_files:
-        csv_file = csv_dir / (txt_file.stem + ".csv")
-        print(f"Converting {txt_file.name} -> {csv_file.name}")
+    for i, (txt_file, csv_file, (success, row_count)) in enumerate(zip(txt_files, csv_files, results), 1):
+        if VERBOSE:
+            print(f"Converting {txt_file.name} -> {csv_file.name}")
         
-        success, row_count = convert_file(txt_file, csv_file)
         if success:
             success_count += 1
             total_rows += row_count
-            print(f"  ✅ {row_count} rows written")
+            if VERBOSE:
+                print(f"  ✅ {row_count} rows written")
         else:
             print(f"  ❌ Failed to convert {txt_file.name}")
+        
+        if not VERBOSE and i % _PROGRESS_EVERY == 0:
+            print(f"  {i}/{len(txt_files)} files processed")
     
     print(f"\nCompleted: {success_count}/{len(txt_files)} files converted successfully")
     print(f"Total CSV rows generated: {total_rows}")
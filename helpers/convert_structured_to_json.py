@@ -6,9 +6,92 @@ Convert structured text TTLV files to JSON format
 import os
 import sys
 import json
-import re
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+# TTLV_VERBOSE=1 prints every file as it's converted instead of periodic progress
+VERBOSE = os.environ.get('TTLV_VERBOSE') == '1'
+_PROGRESS_EVERY = 100
+
+# orjson is optional; the standard json module is used when it's missing
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Data types accepted in the structured text format
+_TYPES = frozenset(['TEXT_STRING', 'BYTE_STRING', 'INTEGER', 'LONG_INTEGER', 'ENUMERATION', 'BOOLEAN', 'STRUCTURE', 'DATE_TIME'])
+
+# Characters allowed in a tag name
+_TAG_CHARS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ_'
+
+# Wrappers around TEXT_STRING (bytearray(b'...')) and BYTE_STRING (b'...') values
+_BA_PREFIX = "bytearray(b'"
+_BA_SUFFIX = "')"
+_BA_PREFIX_LEN = len(_BA_PREFIX)
+_BA_SUFFIX_LEN = len(_BA_SUFFIX)
+_B_PREFIX = "b'"
+_B_SUFFIX = "'"
+_B_PREFIX_LEN = len(_B_PREFIX)
+_B_SUFFIX_LEN = len(_B_SUFFIX)
+
+# BOOLEAN spellings that need no case folding
+_BOOL_TRUE = frozenset(['true', 'True', 'TRUE', '1', 'yes', 'Yes', 'YES'])
+_BOOL_FALSE = frozenset(['false', 'False', 'FALSE', '0', 'no', 'No', 'NO'])
+
+def _strip_bytearray(value):
+    """Remove the bytearray(b'...') wrapper from a TEXT_STRING value, if present."""
+    if value.startswith(_BA_PREFIX) and value.endswith(_BA_SUFFIX):
+        return value[_BA_PREFIX_LEN:-_BA_SUFFIX_LEN]  # Remove bytearray(b' and ')
+    return value
+
+def _strip_bprefix(value):
+    """Remove the b'...' wrapper from a BYTE_STRING value, if present."""
+    if value.startswith(_B_PREFIX) and value.endswith(_B_SUFFIX):
+        return value[_B_PREFIX_LEN:-_B_SUFFIX_LEN]  # Remove b' and '
+    return value
+
+def _parse_enum(value):
+    """Convert an ENUMERATION value to int if it's numeric, otherwise keep the name."""
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+def _parse_bool(value):
+    """Convert a BOOLEAN value."""
+    # Common spellings are looked up directly; only unusual casing is lowered
+    if value in _BOOL_TRUE:
+        return True
+    if value in _BOOL_FALSE:
+        return False
+    return value.lower() in ('true', '1', 'yes')
+
+def _parse_datetime(value):
+    """Convert a DATE_TIME value, handling both Unix timestamps and date strings."""
+    try:
+        # Try to parse as Unix timestamp first
+        return int(value)
+    except ValueError:
+        # If it's a date string, keep it as string
+        return value
+
+def _parse_structure(value):
+    """For structures, the value is just a structure identifier."""
+    return []  # Will be populated with child elements
+
+# Value converters for each data type
+_HANDLERS = {
+    "STRUCTURE": _parse_structure,
+    "TEXT_STRING": _strip_bytearray,
+    "BYTE_STRING": _strip_bprefix,
+    "INTEGER": int,
+    "LONG_INTEGER": int,
+    "ENUMERATION": _parse_enum,
+    "BOOLEAN": _parse_bool,
+    "DATE_TIME": _parse_datetime,
+}
+
 def parse_structured_line(line):
     """Parse a single line of structured text format."""
     # Remove leading whitespace to determine indentation level
@@ -19,194 +102,112 @@ def parse_structured_line(line):
     indent_level = len(line) - len(stripped)
     
     # Parse the line format: TAG:TYPE(length):value
-    match = re.match(r'^([A-Z_]+):(TEXT_STRING|BYTE_STRING|INTEGER|LONG_INTEGER|ENUMERATION|BOOLEAN|STRUCTURE|DATE_TIME)\((\d+)\):(.*)$', stripped)
-    if not match:
+    tag, _, rest = stripped.partition(':')
+    type_and_length, separator, value = rest.partition('):')
+    data_type, _, length = type_and_length.partition('(')
+    if value.endswith('\n'):
+        value = value[:-1]
+    if (not separator or data_type not in _TYPES or not length.isdecimal()
+            or not tag or tag.strip(_TAG_CHARS) or '\n' in value):
         return None
     
-    tag, data_type, length, value = match.groups()
-    
-    # Process the value based on type
-    if data_type == "STRUCTURE":
-        # For structures, the value is just a structure identifier
-        return {
-            "tag": tag,
-            "type": data_type,
-            "indent": indent_level,
-            "value": []  # Will be populated with child elements
-        }
-    elif data_type == "TEXT_STRING":
-        # Remove bytearray(b'...') wrapper if present
-        if value.startswith("bytearray(b'") and value.endswith("')"):
-            actual_value = value[12:-2]  # Remove bytearray(b' and ')
-        else:
-            actual_value = value
-        return {
-            "tag": tag,
-            "type": data_type,
-            "indent": indent_level,
-            "value": actual_value
-        }
-    elif data_type == "BYTE_STRING":
-        # Handle byte strings - remove b' prefix and ' suffix if present
-        if value.startswith("b'") and value.endswith("'"):
-            actual_value = value[2:-1]  # Remove b' and '
-        else:
-            actual_value = value
-        return {
-            "tag": tag,
-            "type": data_type,
-            "indent": indent_level,
-            "value": actual_value
-        }
-    elif data_type == "INTEGER" or data_type == "LONG_INTEGER":
-        return {
-            "tag": tag,
-            "type": data_type,
-            "indent": indent_level,
-            "value": int(value)
-        }
-    elif data_type == "ENUMERATION":
-        # Try to convert to int if it's numeric, otherwise keep as string
-        try:
-            enum_value = int(value)
-        except ValueError:
-            enum_value = value
-        return {
-            "tag": tag,
-            "type": data_type,
-            "indent": indent_level,
-            "value": enum_value
-        }
-    elif data_type == "BOOLEAN":
-        bool_value = value.lower() in ('true', '1', 'yes')
-        return {
-            "tag": tag,
-            "type": data_type,
-            "indent": indent_level,
-            "value": bool_value
-        }
-    elif data_type == "DATE_TIME":
-        # Handle both Unix timestamps and date strings
-        try:
-            # Try to parse as Unix timestamp first
-            timestamp_value = int(value)
-        except ValueError:
-            # If it's a date string, keep it as string for now
-            timestamp_value = value
-        return {
-            "tag": tag,
-            "type": data_type,
-            "indent": indent_level,
-            "value": timestamp_value
-        }
-    
-    return None
+    # Only a handful of distinct tags and types recur, so share one string each
+    tag = sys.intern(tag)
+    data_type = sys.intern(data_type)
+    
+    # Every type in _TYPES has a handler
+    return {
+        "tag": tag,
+        "type": data_type,
+        "indent": indent_level,
+        "value": _HANDLERS[data_type](value)
+    }
 
 def build_json_structure(parsed_lines):
-    """Convert parsed lines to nested JSON structure."""
-    if not parsed_lines:
-        return []
+    """Convert parsed lines to nested JSON structure.
     
-    # Start with the root element (always has indent 0)
-    if len(parsed_lines) == 1:
-        element = parsed_lines[0]
-        if element["type"] == "STRUCTURE":
-            return [{
-                "tag": element["tag"],
-                "type": element["type"],
-                "value": []
-            }]
-        else:
-            return [{
-                "tag": element["tag"],
-                "type": element["type"],
-                "value": element["value"]
-            }]
-    
-    # For multiple elements, process them as siblings at the same level
+    The parsed line dicts are reused as the JSON nodes, with their "indent"
+    key removed.
+    """
     result = []
-    i = 0
+    # Open structures as [children, indent of direct children, seen a direct child]
+    stack = []
     
-    while i < len(parsed_lines):
-        current = parsed_lines[i]
+    for element in parsed_lines:
+        indent = element.pop("indent")
         
-        if current["type"] == "STRUCTURE":
-            # Find children (next level of indentation)
-            children_start = i + 1
-            children_end = children_start
-            target_indent = current["indent"] + 1
-            
-            # Find all elements that belong to this structure
-            while children_end < len(parsed_lines) and parsed_lines[children_end]["indent"] >= target_indent:
-                children_end += 1
-            
-            # Extract children lines
-            children_lines = []
-            j = children_start
-            while j < children_end:
-                if parsed_lines[j]["indent"] == target_indent:
-                    # This is a direct child, find its end
-                    child_start = j
-                    child_end = j + 1
-                    while child_end < children_end and parsed_lines[child_end]["indent"] > target_indent:
-                        child_end += 1
-                    
-                    # Add this child and its descendants
-                    child_lines = parsed_lines[child_start:child_end]
-                    if len(child_lines) == 1:
-                        # Simple element
-                        child = child_lines[0]
-                        children_lines.append({
-                            "tag": child["tag"],
-                            "type": child["type"],
-                            "value": child["value"]
-                        })
-                    else:
-                        # Structure with children - recursively process
-                        child_structure = build_json_structure(child_lines)
-                        children_lines.extend(child_structure)
-                    
-                    j = child_end
-                else:
-                    j += 1
-            
-            result.append({
-                "tag": current["tag"],
-                "type": current["type"],
-                "value": children_lines
-            })
-            
-            i = children_end
+        # Close the structures this element is not nested in
+        while stack and indent < stack[-1][1]:
+            stack.pop()
+        
+        if stack:
+            children = stack[-1][0]
+            if indent == stack[-1][1]:
+                stack[-1][2] = True
+            elif not stack[-1][2]:
+                # Nested deeper than a direct child, with no direct child to
+                # belong to yet - skip it
+                continue
         else:
-            # Simple element
-            result.append({
-                "tag": current["tag"],
-                "type": current["type"],
-                "value": current["value"]
-            })
-            i += 1
+            children = result
+        
+        if element["type"] == "STRUCTURE":
+            # The parser already gave the structure an empty child list
+            stack.append([element["value"], indent + 1, False])
+        
+        children.append(element)
     
     return result
 
+def _strip_lines(lines):
+    """Yield the non-blank lines, trimmed as if the whole text had been strip()ped.
+    
+    The first line loses its leading whitespace and the last its trailing
+    whitespace, so parsing a file line by line matches parsing its text.
+    """
+    previous = None
+    for line in lines:
+        line = line.rstrip('\n')
+        if not line.strip():
+            continue  # Blank lines don't parse to anything
+        if previous is None:
+            line = line.lstrip()
+        else:
+            yield previous
+        previous = line
+    if previous is not None:
+        yield previous.rstrip()
+
+def parse_structured_lines(lines):
+    """Parse structured text lines, skipping any that don't match the format."""
+    return [parsed for line in _strip_lines(lines)
+            if (parsed := parse_structured_line(line))]
+
 def convert_structured_to_json(structured_text):
     """Convert structured text to JSON format."""
     lines = structured_text.strip().split('\n')
-    parsed_lines = []
-    
-    for line in lines:
-        parsed = parse_structured_line(line)
-        if parsed:
-            parsed_lines.append(parsed)
-    
-    return build_json_structure(parsed_lines)
+    return build_json_structure(parse_structured_lines(lines))
 
 def convert_file(input_path, output_path):
     """Convert a single structured text file to JSON."""
     try:
+        # Parse the file line by line rather than reading it whole
         with open(input_path, 'r', encoding='utf-8') as f:
-            structured_text = f.read()
+            parsed_lines = parse_structured_lines(f)
         
-        json_data = convert_structured_to_json(structured_text)
+        json_data = build_json_structure(parsed_lines)
+        
+        if orjson is not None:
+            # Same formatting as json.dump below, serialized in C
+            try:
+                data = orjson.dumps(json_data, option=orjson.OPT_INDENT_2)
+            except orjson.JSONEncodeError:
+                # orjson rejects integers over 64 bits; json.dump below handles them
+                pass
+            else:
+                with open(output_path, 'wb') as f:
+                    f.write(data)
+                return True
         
         with open(output_path, 'w', encoding='utf-8') as f:
             json.dump(json_data, f, indent=2, ensure_ascii=False)
@@ -228,20 +229,31 @@ def main():
     # Create JSON directory if it doesn't exist
     json_dir.mkdir(exist_ok=True)
     
-    # Find all .txt files
-    txt_files = list(structured_dir.glob("*.txt"))
+    # Find all .txt files; scandir reports file types without a stat per entry
+    with os.scandir(structured_dir) as entries:
+        txt_files = [Path(entry.path) for entry in entries
+                     if entry.name.endswith(".txt") and entry.is_file()]
     
     print(f"Converting {len(txt_files)} structured text files to JSON...")
     
+    json_files = [json_dir / (txt_file.stem + ".json") for txt_file in txt_files]
+    
+    # Files are independent, so convert them in parallel across CPU cores
+    with ProcessPoolExecutor() as executor:
+        results = list(executor.map(convert_file, txt_files, json_files))
+    
     success_count = 0
-    for txt_file in txt_files:
-        json_file = json_dir / (txt_file.stem + ".json")
-        print(f"Converting {txt_file.name} -> {json_file.name}")
+    for i, (txt_file, json_file, success) in enumerate(zip(txt_files, json_files, results), 1):
+        if VERBOSE:
+            print(f"Converting {txt_file.name} -> {json_file.name}")
         
-        if convert_file(txt_file, json_file):
+        if success:
             success_count += 1
         else:
             print(f"Failed to convert {txt_file.name}")
+        
+        if not VERBOSE and i % _PROGRESS_EVERY == 0:
+            print(f"  {i}/{len(txt_files)} files processed")
     
     print(f"\nCompleted: {success_count}/{len(txt_files)} files converted successfully")
 
@@ -25,7 +25,7 @@ For CSV files:
 5. Compares the original CSV with the converted CSV
 
 Usage:
-    python test_roundtrip.py [--format structured|json|csv|all] [--show-results]
+    python test_roundtrip.py [--format structured|json|csv|all] [--show-results] [--cache]
 """
 
 import os
@@ -33,118 +33,200 @@ import sys
 import traceback
 import json
 import argparse
+import hashlib
+import io
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from functools import lru_cache
+from itertools import islice, repeat, zip_longest
 from pathlib import Path
 
+# TTLV_VERBOSE=1 shows the per-step output for every file, like --show-results
+VERBOSE = os.environ.get('TTLV_VERBOSE') == '1'
+
 # Add the current directory to Python path to import our modules
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'helpers'))
+_SCRIPT_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(_SCRIPT_DIR))
+sys.path.insert(0, str(_SCRIPT_DIR / 'helpers'))
+
+# Differences shown per failed file; comparisons stop collecting one past this
+MAX_SHOWN_DIFFERENCES = 10
+
+# orjson is optional; the standard json module is used when it's missing
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Encoded TTLV binaries are kept here between runs when --cache is given
+CACHE_DIR = _SCRIPT_DIR / '.ttlv_cache'
 
 try:
-    from encode_ttlv import load_from_structured_text_file, encode_from_structured_text, load_from_json_file, encode_ttlv_structure, load_from_text_file
+    from encode_ttlv import encode_from_structured_text, load_from_json_file, encode_ttlv_structure, load_from_text_file, EncodeTTLV
     from decode_ttlv import DecodeTTLV
     from helpers.convert_structured_to_json import convert_structured_to_json
-    from helpers.convert_structured_to_csv import convert_structured_to_csv
-    import subprocess
-    import io
-    import csv
-    from contextlib import redirect_stdout
 except ImportError as e:
     print(f"Error importing modules: {e}")
     print("Make sure encode_ttlv.py, decode_ttlv.py, and helpers/convert_structured_to_json.py are available")
     sys.exit(1)
 
+# Decoder and encoder reused for every file in this process; each test runs
+# sequentially within its worker, so they're never shared between threads
+_DECODER = None
+_ENCODER = EncodeTTLV()
+
 def decode_ttlv_binary(binary_data):
     """Decode TTLV binary data to structured text using the DecodeTTLV class."""
+    global _DECODER
     try:
-        # Create a string buffer to capture the printed output
-        output_buffer = io.StringIO()
-        
-        # Create decoder instance
-        decoder = DecodeTTLV(binary_data)
-        
-        # Capture the decode output
-        with redirect_stdout(output_buffer):
-            decoder.decode()
+        if _DECODER is None:
+            _DECODER = DecodeTTLV(binary_data)
+        else:
+            _DECODER.reset(binary_data)
         
-        # Get the captured output
-        decoded_text = output_buffer.getvalue()
-        return decoded_text
+        # Join the decoded lines as they're produced instead of capturing stdout
+        decoded_text = '\n'.join(_DECODER.decode_iter())
+        return decoded_text + '\n' if decoded_text else ''
         
     except Exception as e:
         raise Exception(f"Failed to decode TTLV binary: {e}")
 
-def normalize_text(text):
-    """Normalize text for comparison by removing extra whitespace and ensuring consistent line endings."""
-    lines = []
+def parse_json(data):
+    """Parse JSON bytes, with orjson when available."""
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # orjson rejects some input json accepts, like integers over 64 bits
+            pass
+    return json.loads(data)
+
+@lru_cache(maxsize=None)
+def _encoder_digest():
+    """Hash the encoder source, so cached binaries are dropped when it changes."""
+    return hashlib.sha256((_SCRIPT_DIR / 'encode_ttlv.py').read_bytes()).digest()
+
+def _timezone_key():
+    """Describe the local timezone, since DATE_TIME strings are encoded as local time."""
+    return repr((os.environ.get('TZ'), time.timezone, time.altzone, time.tzname)).encode()
+
+def encode_cached(file_path, encode, use_cache):
+    """Return the TTLV binary from encode(), reusing an earlier result for identical input when use_cache is set."""
+    if not use_cache:
+        return encode()
+    
+    key = hashlib.sha256(_encoder_digest() + _timezone_key() + file_path.read_bytes()).hexdigest()
+    cache_file = CACHE_DIR / key
+    try:
+        # The decoder formats text values differently for bytes and bytearray
+        return bytearray(cache_file.read_bytes())
+    except FileNotFoundError:
+        pass
+    
+    ttlv_binary = encode()
+    CACHE_DIR.mkdir(exist_ok=True)
+    # Write then rename, so parallel tests never read a partial file
+    tmp_file = cache_file.with_name(f"{key}.{os.getpid()}.tmp")
+    tmp_file.write_bytes(ttlv_binary)
+    os.replace(tmp_file, cache_file)
+    return ttlv_binary
+
+def _normalized_lines(text):
+    """Yield the non-empty lines of text with trailing whitespace stripped."""
     for line in text.strip().split('\n'):
         # Strip trailing whitespace but preserve leading spaces for indentation
         normalized_line = line.rstrip()
         if normalized_line:  # Skip empty lines
-            lines.append(normalized_line)
-    return '\n'.join(lines)
+            yield normalized_line
+
+def normalize_text(text):
+    """Normalize text for comparison by removing extra whitespace and ensuring consistent line endings."""
+    return '\n'.join(_normalized_lines(text))
 
-def compare_structures(original, decoded):
-    """Compare two structured text representations and return differences."""
-    orig_normalized = normalize_text(original)
-    decoded_normalized = normalize_text(decoded)
+def describe_difference_count(differences):
+    """Describe how many differences were found, given a list capped one past MAX_SHOWN_DIFFERENCES."""
+    if len(differences) > MAX_SHOWN_DIFFERENCES:
+        return f"more than {MAX_SHOWN_DIFFERENCES} differences"
+    return f"{len(differences)} differences"
+
+def compare_structures(original, decoded, limit=None):
+    """Compare two structured text representations and return differences.
     
-    if orig_normalized == decoded_normalized:
+    Differences are (line number, original line, decoded line) tuples; the
+    caller formats only the ones it displays. At most limit are collected.
+    """
+    # Identical text needs no normalization. Normalizing starts by stripping
+    # the whole text, so texts equal after strip() normalize identically too.
+    if original == decoded or original.strip() == decoded.strip():
         return True, []
     
-    # Find differences line by line
-    orig_lines = orig_normalized.split('\n')
-    decoded_lines = decoded_normalized.split('\n')
-    
-    differences = []
-    max_lines = max(len(orig_lines), len(decoded_lines))
-    
-    for i in range(max_lines):
-        orig_line = orig_lines[i] if i < len(orig_lines) else "<MISSING>"
-        decoded_line = decoded_lines[i] if i < len(decoded_lines) else "<MISSING>"
-        
-        if orig_line != decoded_line:
-            differences.append(f"Line {i+1}:")
-            differences.append(f"  Original: {orig_line}")
-            differences.append(f"  Decoded:  {decoded_line}")
+    # Walk the normalized lines of both sides together in a single pass
+    differences = list(islice((
+        (i, orig_line, decoded_line)
+        for i, (orig_line, decoded_line) in enumerate(
+            zip_longest(_normalized_lines(original), _normalized_lines(decoded),
+                        fillvalue="<MISSING>"), 1)
+        if orig_line != decoded_line
+    ), limit))
     
-    return False, differences
+    return not differences, differences
 
-def compare_json_structures(original_json, converted_json):
-    """Compare two JSON structures and return differences."""
+def compare_json_structures(original_json, converted_json, limit=None):
+    """Compare two JSON structures and return up to limit differences."""
     if original_json == converted_json:
         return True, []
     
-    # Find differences
+    # Find differences, walking both structures with an explicit stack of
+    # (original, converted, path) entries rather than recursing
     differences = []
+    stack = [(original_json, converted_json, "")]
     
-    def compare_recursive(obj1, obj2, path=""):
-        if type(obj1) != type(obj2):
+    while stack and (limit is None or len(differences) < limit):
+        obj1, obj2, path = stack.pop()
+        
+        # The same object can't differ from itself
+        if obj1 is obj2:
+            continue
+        
+        if type(obj1) is not type(obj2):
             differences.append(f"{path}: Type mismatch - {type(obj1).__name__} vs {type(obj2).__name__}")
-            return
+            continue
         
         if isinstance(obj1, dict):
-            for key in set(obj1.keys()) | set(obj2.keys()):
+            for key in obj2:
                 if key not in obj1:
                     differences.append(f"{path}.{key}: Missing in original")
-                elif key not in obj2:
+            for key in obj1:
+                if key not in obj2:
                     differences.append(f"{path}.{key}: Missing in converted")
-                else:
-                    compare_recursive(obj1[key], obj2[key], f"{path}.{key}")
+            # Common keys are pushed in reverse so they're compared in the original's order
+            stack.extend((obj1[key], obj2[key], f"{path}.{key}") for key in reversed(obj1) if key in obj2)
         elif isinstance(obj1, list):
             if len(obj1) != len(obj2):
                 differences.append(f"{path}: List length mismatch - {len(obj1)} vs {len(obj2)}")
-                return
-            for i, (item1, item2) in enumerate(zip(obj1, obj2)):
-                compare_recursive(item1, item2, f"{path}[{i}]")
+                continue
+            # Pushed in reverse so items are compared in order
+            for i in range(len(obj1) - 1, -1, -1):
+                stack.append((obj1[i], obj2[i], f"{path}[{i}]"))
         else:
             if obj1 != obj2:
                 differences.append(f"{path}: Value mismatch - '{obj1}' vs '{obj2}'")
     
-    compare_recursive(original_json, converted_json)
-    return False, differences
+    return False, differences[:limit]
 
-def compare_csv_structures(original_csv_rows, converted_csv_rows):
-    """Compare two CSV row structures and return differences."""
+def normalize_csv_value(value):
+    """Normalize CSV value by removing quotes if present and stripping whitespace."""
+    if not isinstance(value, str):
+        value = str(value)
+    value = value.strip()
+    # Remove quotes if the value is quoted
+    if len(value) >= 2 and value[0] == '"' and value[-1] == '"':
+        value = value[1:-1]
+    return value
+
+def compare_csv_structures(original_csv_rows, converted_csv_rows, limit=None):
+    """Compare two CSV row structures and return up to limit differences."""
     if original_csv_rows == converted_csv_rows:
         return True, []
     
@@ -155,20 +237,19 @@ def compare_csv_structures(original_csv_rows, converted_csv_rows):
         differences.append(f"Row count mismatch - original: {len(original_csv_rows)}, converted: {len(converted_csv_rows)}")
         return False, differences
     
-    def normalize_csv_value(value):
-        """Normalize CSV value by removing quotes if present and stripping whitespace."""
-        value = str(value).strip()
-        # Remove quotes if the value is quoted
-        if len(value) >= 2 and value.startswith('"') and value.endswith('"'):
-            value = value[1:-1]
-        return value
-    
     for i, (orig_row, conv_row) in enumerate(zip(original_csv_rows, converted_csv_rows)):
+        if limit is not None and len(differences) >= limit:
+            break
+        
         if len(orig_row) != len(conv_row):
             differences.append(f"Row {i}: Column count mismatch - original: {len(orig_row)}, converted: {len(conv_row)}")
             continue
             
         for j, (orig_cell, conv_cell) in enumerate(zip(orig_row, conv_row)):
+            # Equal cells need no normalization
+            if orig_cell == conv_cell:
+                continue
+            
             # Normalize both values to handle CSV quoting differences
             orig_normalized = normalize_csv_value(orig_cell)
             conv_normalized = normalize_csv_value(conv_cell)
@@ -180,14 +261,18 @@ def compare_csv_structures(original_csv_rows, converted_csv_rows):
     if len(differences) == 0:
         return True, []
     else:
-        return False, differences
+        return False, differences[:limit]
 
-def test_structured_file(file_path, show_results=True):
+def list_test_files(directory, suffix):
+    """Return the files in a directory whose names end with suffix, sorted."""
+    # scandir reports names and file types without a separate stat per entry
+    with os.scandir(directory) as entries:
+        return sorted(Path(entry.path) for entry in entries
+                      if entry.name.endswith(suffix) and entry.is_file())
+
+def test_structured_file(file_path, show_results=True, use_cache=False):
     """Test encoding and decoding for a single structured text file."""
-    if isinstance(file_path, str):
-        file_name = os.path.basename(file_path)
-    else:
-        file_name = file_path.name
+    file_name = file_path.name
     
     if show_results:
         print(f"\n{'='*60}")
@@ -213,9 +298,8 @@ def test_structured_file(file_path, show_results=True):
         if show_results:
             print("2. Encoding to TTLV binary...")
         try:
-            structured_data = load_from_structured_text_file(str(file_path))
-            encoder = encode_from_structured_text(original_text)
-            ttlv_binary = encoder.get_buffer()  # Get the actual binary data
+            ttlv_binary = encode_cached(
+                file_path, lambda: encode_from_structured_text(original_text).get_buffer(), use_cache)
             if show_results:
                 print(f"   ✅ Encoded to {len(ttlv_binary)} bytes")
         except Exception as e:
@@ -238,7 +322,7 @@ def test_structured_file(file_path, show_results=True):
         # Step 4: Compare original and decoded
         if show_results:
             print("4. Comparing original and decoded...")
-        matches, differences = compare_structures(original_text, decoded_text)
+        matches, differences = compare_structures(original_text, decoded_text, MAX_SHOWN_DIFFERENCES + 1)
         
         if matches:
             if show_results:
@@ -251,11 +335,13 @@ def test_structured_file(file_path, show_results=True):
                 print(f"❌ FAILED: Structured: {file_name}")
                 print(f"{'='*60}")
             print("   ⚠️  DIFFERENCES FOUND:")
-            for diff in differences[:10]:  # Show first 10 differences
-                print(f"      {diff}")
-            if len(differences) > 10:
-                print(f"      ... and {len(differences) - 10} more differences")
-            return False, f"Comparison failed: {len(differences)} differences"
+            for line_num, orig_line, decoded_line in differences[:MAX_SHOWN_DIFFERENCES]:
+                print(f"      Line {line_num}:")
+                print(f"        Original: {orig_line}")
+                print(f"        Decoded:  {decoded_line}")
+            if len(differences) > MAX_SHOWN_DIFFERENCES:
+                print("      ... and more differences")
+            return False, f"Comparison failed: {describe_difference_count(differences)}"
             
     except Exception as e:
         # Always show errors, even when hiding results
@@ -267,12 +353,9 @@ def test_structured_file(file_path, show_results=True):
         print(f"   Stack trace: {traceback.format_exc()}")
         return False, f"Unexpected error: {e}"
 
-def test_json_file(file_path, show_results=True):
+def test_json_file(file_path, show_results=True, use_cache=False):
     """Test encoding and decoding for a single JSON file."""
-    if isinstance(file_path, str):
-        file_name = os.path.basename(file_path)
-    else:
-        file_name = file_path.name
+    file_name = file_path.name
     
     if show_results:
         print(f"\n{'='*60}")
@@ -283,8 +366,9 @@ def test_json_file(file_path, show_results=True):
         # Step 1: Load original JSON
         if show_results:
             print("1. Loading original JSON...")
-        with open(file_path, 'r', encoding='utf-8') as f:
-            original_json = json.load(f)
+        with open(file_path, 'rb') as f:
+            raw_json = f.read()
+        original_json = parse_json(raw_json)
         
         if not original_json:
             if show_results:
@@ -292,15 +376,15 @@ def test_json_file(file_path, show_results=True):
             return False, "Empty file"
         
         if show_results:
-            print(f"   ✅ Loaded {len(json.dumps(original_json))} characters")
+            print(f"   ✅ Loaded {len(raw_json)} bytes")
         
         # Step 2: Encode to TTLV binary
         if show_results:
             print("2. Encoding JSON to TTLV binary...")
         try:
             # Encode using the same approach as the main script
-            encoder = encode_ttlv_structure(original_json)
-            ttlv_binary = encoder.get_buffer()
+            ttlv_binary = encode_cached(
+                file_path, lambda: encode_ttlv_structure(original_json, _ENCODER).get_buffer(), use_cache)
             if show_results:
                 print(f"   ✅ Encoded to {len(ttlv_binary)} bytes")
         except Exception as e:
@@ -335,7 +419,7 @@ def test_json_file(file_path, show_results=True):
         # Step 5: Compare original JSON with converted JSON
         if show_results:
             print("5. Comparing original and converted JSON...")
-        matches, differences = compare_json_structures(original_json, converted_json)
+        matches, differences = compare_json_structures(original_json, converted_json, MAX_SHOWN_DIFFERENCES + 1)
         
         if matches:
             if show_results:
@@ -348,11 +432,11 @@ def test_json_file(file_path, show_results=True):
                 print(f"❌ FAILED: JSON: {file_name}")
                 print(f"{'='*60}")
             print("   ⚠️  DIFFERENCES FOUND:")
-            for diff in differences[:10]:  # Show first 10 differences
+            for diff in differences[:MAX_SHOWN_DIFFERENCES]:
                 print(f"      {diff}")
-            if len(differences) > 10:
-                print(f"      ... and {len(differences) - 10} more differences")
-            return False, f"Comparison failed: {len(differences)} differences"
+            if len(differences) > MAX_SHOWN_DIFFERENCES:
+                print("      ... and more differences")
+            return False, f"Comparison failed: {describe_difference_count(differences)}"
             
     except Exception as e:
         # Always show errors, even when hiding results
@@ -364,12 +448,13 @@ def test_json_file(file_path, show_results=True):
         print(f"   Stack trace: {traceback.format_exc()}")
         return False, f"Unexpected error: {e}"
 
-def test_csv_file(file_path, show_results=True):
+def test_csv_file(file_path, show_results=True, use_cache=False):
     """Test encoding and decoding for a single CSV file."""
-    if isinstance(file_path, str):
-        file_name = os.path.basename(file_path)
-    else:
-        file_name = file_path.name
+    # Imported here so runs that skip the CSV format don't load them
+    import csv
+    from helpers.convert_structured_to_csv import convert_structured_to_csv
+    
+    file_name = file_path.name
     
     if show_results:
         print(f"\n{'='*60}")
@@ -398,9 +483,8 @@ def test_csv_file(file_path, show_results=True):
             print("2. Encoding CSV to TTLV binary...")
         try:
             # Use the same approach as the main script for CSV files
-            elements = load_from_text_file(str(file_path))
-            encoder = encode_ttlv_structure(elements)
-            ttlv_binary = encoder.get_buffer()
+            ttlv_binary = encode_cached(
+                file_path, lambda: encode_ttlv_structure(load_from_text_file(str(file_path)), _ENCODER).get_buffer(), use_cache)
             if show_results:
                 print(f"   ✅ Encoded to {len(ttlv_binary)} bytes")
         except Exception as e:
@@ -436,7 +520,7 @@ def test_csv_file(file_path, show_results=True):
         # Step 5: Compare original CSV with converted CSV
         if show_results:
             print("5. Comparing original and converted CSV...")
-        matches, differences = compare_csv_structures(original_csv_rows, converted_csv_rows)
+        matches, differences = compare_csv_structures(original_csv_rows, converted_csv_rows, MAX_SHOWN_DIFFERENCES + 1)
         
         if matches:
             if show_results:
@@ -449,11 +533,11 @@ def test_csv_file(file_path, show_results=True):
                 print(f"❌ FAILED: CSV: {file_name}")
                 print(f"{'='*60}")
             print("   ⚠️  DIFFERENCES FOUND:")
-            for diff in differences[:10]:  # Show first 10 differences
+            for diff in differences[:MAX_SHOWN_DIFFERENCES]:
                 print(f"      {diff}")
-            if len(differences) > 10:
-                print(f"      ... and {len(differences) - 10} more differences")
-            return False, f"Comparison failed: {len(differences)} differences"
+            if len(differences) > MAX_SHOWN_DIFFERENCES:
+                print("      ... and more differences")
+            return False, f"Comparison failed: {describe_difference_count(differences)}"
             
     except Exception as e:
         # Always show errors, even when hiding results
@@ -465,6 +549,21 @@ def test_csv_file(file_path, show_results=True):
         print(f"   Stack trace: {traceback.format_exc()}")
         return False, f"Unexpected error: {e}"
 
+def _run_file_test(test_func, file_path, show_results, use_cache):
+    """Run a single file test in a worker process, returning what it printed as well."""
+    output = io.StringIO()
+    with redirect_stdout(output):
+        success, message = test_func(file_path, show_results, use_cache)
+    return success, message, output.getvalue()
+
+def run_file_tests(executor, test_func, files, show_results, use_cache=False):
+    """Run test_func on every file in parallel, yielding (file_path, success, message) in order."""
+    results = executor.map(_run_file_test, repeat(test_func), files, repeat(show_results), repeat(use_cache))
+    for file_path, (success, message, output) in zip(files, results):
+        # Replay each test's output in file order so it never interleaves
+        print(output, end='')
+        yield file_path, success, message
+
 def main():
     """Main function to test files in both structured and JSON formats."""
     parser = argparse.ArgumentParser(description='TTLV Round-Trip Validation Script')
@@ -474,158 +573,169 @@ def main():
                         help='Show detailed results for all tests (default: hide successful tests)')
     parser.add_argument('--all-files-summary', choices=['failed', 'off', 'all'], default='failed',
                         help='Control ALL FILES SUMMARY display: failed=show only failed files (default), off=show nothing, all=show all files')
+    parser.add_argument('--cache', action='store_true',
+                        help='Reuse TTLV binaries encoded by earlier runs for unchanged input files (stored in .ttlv_cache)')
     args = parser.parse_args()
     
     print("🧪 TTLV Round-Trip Validation Script")
     print("=" * 50)
     
     # Show results only if explicitly requested
-    show_results = args.show_results
+    show_results = args.show_results or VERBOSE
     
     total_passed = 0
     total_failed = 0
     all_results = []
+    # Passing files are only listed by --all-files-summary all
+    collect_passes = args.all_files_summary == 'all'
     
-    # Test structured text files
-    if args.format in ['structured', 'all']:
-        print("\n🔤 Testing Structured Text Files")
-        print("-" * 50)
-        
-        structured_dir = Path("test_cases/structured")
-        if not structured_dir.exists():
-            print(f"❌ ERROR: Directory {structured_dir} not found!")
-        else:
-            txt_files = list(structured_dir.glob("*.txt"))
-            if not txt_files:
-                print(f"❌ ERROR: No .txt files found in {structured_dir}")
+    # Files are independent, so test them in parallel across CPU cores
+    with ProcessPoolExecutor() as executor:
+        # Test structured text files
+        if args.format in ['structured', 'all']:
+            print("\n🔤 Testing Structured Text Files")
+            print("-" * 50)
+            
+            structured_dir = Path("test_cases/structured")
+            if not structured_dir.exists():
+                print(f"❌ ERROR: Directory {structured_dir} not found!")
             else:
-                print(f"📁 Found {len(txt_files)} structured text files to test")
-                
-                passed = 0
-                failed = 0
-                
-                for file_path in sorted(txt_files):
-                    success, message = test_structured_file(file_path, show_results)
-                    all_results.append((f"📄 {file_path.name}", success, message))
+                txt_files = list_test_files(structured_dir, ".txt")
+                if not txt_files:
+                    print(f"❌ ERROR: No .txt files found in {structured_dir}")
+                else:
+                    print(f"📁 Found {len(txt_files)} structured text files to test")
                     
-                    if success:
-                        passed += 1
-                        total_passed += 1
-                    else:
-                        failed += 1
-                        total_failed += 1
-                
-                print(f"\n📊 Structured Text Summary: ✅ {passed} passed, ❌ {failed} failed")
-    
-    # Test JSON files
-    if args.format in ['json', 'all']:
-        print("\n🔧 Testing JSON Files")
-        print("-" * 50)
+                    passed = 0
+                    failed = 0
+                    
+                    for file_path, success, message in run_file_tests(executor, test_structured_file, txt_files, show_results, args.cache):
+                        if not success or collect_passes:
+                            all_results.append((f"📄 {file_path.name}", success, message))
+                        
+                        if success:
+                            passed += 1
+                            total_passed += 1
+                        else:
+                            failed += 1
+                            total_failed += 1
+                    
+                    print(f"\n📊 Structured Text Summary: ✅ {passed} passed, ❌ {failed} failed")
         
-        json_dir = Path("test_cases/json")
-        if not json_dir.exists():
-            print(f"❌ ERROR: Directory {json_dir} not found!")
-        else:
-            json_files = list(json_dir.glob("*.json"))
-            if not json_files:
-                print(f"❌ ERROR: No .json files found in {json_dir}")
+        # Test JSON files
+        if args.format in ['json', 'all']:
+            print("\n🔧 Testing JSON Files")
+            print("-" * 50)
+            
+            json_dir = Path("test_cases/json")
+            if not json_dir.exists():
+                print(f"❌ ERROR: Directory {json_dir} not found!")
             else:
-                print(f"📁 Found {len(json_files)} JSON files to test")
-                
-                passed = 0
-                failed = 0
-                
-                for file_path in sorted(json_files):
-                    success, message = test_json_file(file_path, show_results)
-                    all_results.append((f"🔧 {file_path.name}", success, message))
+                json_files = list_test_files(json_dir, ".json")
+                if not json_files:
+                    print(f"❌ ERROR: No .json files found in {json_dir}")
+                else:
+                    print(f"📁 Found {len(json_files)} JSON files to test")
                     
-                    if success:
-                        passed += 1
-                        total_passed += 1
-                    else:
-                        failed += 1
-                        total_failed += 1
-                
-                print(f"\n📊 JSON Summary: ✅ {passed} passed, ❌ {failed} failed")
-    
-    # Test CSV files
-    if args.format in ['csv', 'all']:
-        print("\n📊 Testing CSV Files")
-        print("-" * 50)
+                    passed = 0
+                    failed = 0
+                    
+                    for file_path, success, message in run_file_tests(executor, test_json_file, json_files, show_results, args.cache):
+                        if not success or collect_passes:
+                            all_results.append((f"🔧 {file_path.name}", success, message))
+                        
+                        if success:
+                            passed += 1
+                            total_passed += 1
+                        else:
+                            failed += 1
+                            total_failed += 1
+                    
+                    print(f"\n📊 JSON Summary: ✅ {passed} passed, ❌ {failed} failed")
         
-        csv_dir = Path("test_cases/csv")
-        if not csv_dir.exists():
-            print(f"❌ ERROR: Directory {csv_dir} not found!")
-        else:
-            csv_files = list(csv_dir.glob("*.csv"))
-            if not csv_files:
-                print(f"❌ ERROR: No .csv files found in {csv_dir}")
+        # Test CSV files
+        if args.format in ['csv', 'all']:
+            print("\n📊 Testing CSV Files")
+            print("-" * 50)
+            
+            csv_dir = Path("test_cases/csv")
+            if not csv_dir.exists():
+                print(f"❌ ERROR: Directory {csv_dir} not found!")
             else:
-                print(f"📁 Found {len(csv_files)} CSV files to test")
-                
-                passed = 0
-                failed = 0
-                
-                for file_path in sorted(csv_files):
-                    success, message = test_csv_file(file_path, show_results)
-                    all_results.append((f"📊 {file_path.name}", success, message))
+                csv_files = list_test_files(csv_dir, ".csv")
+                if not csv_files:
+                    print(f"❌ ERROR: No .csv files found in {csv_dir}")
+                else:
+                    print(f"📁 Found {len(csv_files)} CSV files to test")
+                    
+                    passed = 0
+                    failed = 0
                     
-                    if success:
-                        passed += 1
-                        total_passed += 1
-                    else:
-                        failed += 1
-                        total_failed += 1
-                
-                print(f"\n📊 CSV Summary: ✅ {passed} passed, ❌ {failed} failed")
+                    for file_path, success, message in run_file_tests(executor, test_csv_file, csv_files, show_results, args.cache):
+                        if not success or collect_passes:
+                            all_results.append((f"📊 {file_path.name}", success, message))
+                        
+                        if success:
+                            passed += 1
+                            total_passed += 1
+                        else:
+                            failed += 1
+                            total_failed += 1
+                    
+                    print(f"\n📊 CSV Summary: ✅ {passed} passed, ❌ {failed} failed")
     
-    # Print overall summary
-    print(f"\n{'='*80}")
-    print("📊 OVERALL SUMMARY")
-    print(f"{'='*80}")
-    print(f"📈 Total files tested: {total_passed + total_failed}")
-    print(f"✅ Passed: {total_passed}")
-    print(f"❌ Failed: {total_failed}")
+    # Build the overall summary and write it out in one go
+    summary = []
+    summary.append(f"\n{'='*80}")
+    summary.append("📊 OVERALL SUMMARY")
+    summary.append(f"{'='*80}")
+    summary.append(f"📈 Total files tested: {total_passed + total_failed}")
+    summary.append(f"✅ Passed: {total_passed}")
+    summary.append(f"❌ Failed: {total_failed}")
     if total_passed + total_failed > 0:
-        print(f"📊 Success rate: {(total_passed/(total_passed + total_failed)*100):.1f}%")
+        summary.append(f"📊 Success rate: {(total_passed/(total_passed + total_failed)*100):.1f}%")
     
     if total_failed > 0:
-        print(f"\n{'='*50}")
-        print("💥 FAILED FILES:")
-        print(f"{'='*50}")
+        summary.append(f"\n{'='*50}")
+        summary.append("💥 FAILED FILES:")
+        summary.append(f"{'='*50}")
         for filename, success, message in all_results:
             if not success:
-                print(f"❌ {filename}: {message}")
+                summary.append(f"❌ {filename}: {message}")
     
     # Display ALL FILES SUMMARY based on the --all-files-summary flag
     if args.all_files_summary != 'off':
         
         if args.all_files_summary == 'failed':
             # Show only failed files
-            print(f"\n{'='*50}")
-            print("📋 FAILED FILES SUMMARY:")
-            print(f"{'='*50}")
+            summary.append(f"\n{'='*50}")
+            summary.append("📋 FAILED FILES SUMMARY:")
+            summary.append(f"{'='*50}")
             failed_files = [result for result in all_results if not result[1]]
             if failed_files:
                 for filename, success, message in failed_files:
-                    print(f"❌ FAIL {filename}")
+                    summary.append(f"❌ FAIL {filename}")
             else:
-                print("✅ No failed files to display")
+                summary.append("✅ No failed files to display")
         elif args.all_files_summary == 'all':
-            print(f"\n{'='*50}")
-            print("📋 ALL FILES SUMMARY:")
-            print(f"{'='*50}")
+            summary.append(f"\n{'='*50}")
+            summary.append("📋 ALL FILES SUMMARY:")
+            summary.append(f"{'='*50}")
             # Show all files
             for filename, success, message in all_results:
                 status = "✅ PASS" if success else "❌ FAIL"
-                print(f"{status} {filename}")
+                summary.append(f"{status} {filename}")
+    
+    if total_failed > 0:
+        summary.append(f"\n⚠️  {total_failed} test(s) failed. Check the output above for details.")
+    else:
+        summary.append(f"\n🎉 All {total_passed} tests passed successfully!")
+    
+    sys.stdout.write('\n'.join(summary) + '\n')
     
     # Exit with error code if any tests failed
     if total_failed > 0:
-        print(f"\n⚠️  {total_failed} test(s) failed. Check the output above for details.")
         sys.exit(1)
-    else:
-        print(f"\n🎉 All {total_passed} tests passed successfully!")
 
 if __name__ == "__main__":
     main()